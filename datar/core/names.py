@@ -3,6 +3,8 @@ import inspect
 import re
 import keyword
 import math
+from collections import Counter
+from collections.abc import Sequence
 from numbers import Number
 from typing import Any, Callable, List, Union, Iterable, Tuple
 
@@ -58,11 +60,12 @@ def _repair_names_unique(
     if callable(sanitizer):
         neat_names = [sanitizer(name) for name in neat_names]
 
+    neat_counts = Counter(neat_names)
     new_names = []
     changed_names = []
     for i, name in enumerate(names):
         neat_name = neat_names[i]
-        if neat_names.count(neat_name) > 1 or neat_name == "":
+        if neat_counts[neat_name] > 1 or neat_name == "":
             neat_name = f"{neat_name}__{i}"
         if neat_name != name:
             changed_names.append((name, neat_name))
@@ -100,8 +103,12 @@ def _repair_names_universal(
 
 def _repair_names_check_unique(names: Iterable[str]) -> Iterable[str]:
     """Just check the uniqueness"""
+    if not isinstance(names, Sequence):
+        # Counter() would exhaust one-shot iterables
+        names = list(names)
+    counts = Counter(names)
     for name in names:
-        if names.count(name) > 1:
+        if counts[name] > 1:
             raise NameNonUniqueError(f"Names must be unique: {name}")
         if name == "" or _isnan(name):
             raise NameNonUniqueError(f"Names can't be empty: {name}")
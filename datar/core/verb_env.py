@@ -2,6 +2,49 @@
 from __future__ import annotations
 
 import os
+import sys
+from functools import lru_cache
+from typing import Mapping
+
+_GLOBAL_AST_FALLBACK_KEY = "DATAR_VERB_AST_FALLBACK"
+
+# The DATAR_*_AST_FALLBACK environment variables, collected on first lookup
+# None means the snapshot is invalidated and will be collected again
+_ENV_SNAPSHOT: Mapping[str, str] | None = None
+
+
+def _env_snapshot() -> Mapping[str, str]:
+    """Collect the non-empty DATAR_*_AST_FALLBACK environment variables
+
+    The environment is scanned once, and the result is reused until
+    `_reset_verb_ast_fallback_cache()` is called.
+
+    The values are interned, so that pipda's comparisons against the mode
+    names (e.g. `fallback == "piping"`) hit the identity fast path.
+    """
+    global _ENV_SNAPSHOT
+    if _ENV_SNAPSHOT is None:
+        _ENV_SNAPSHOT = {
+            key: sys.intern(value)
+            for key, value in os.environ.items()
+            if value
+            and key.startswith("DATAR_")
+            and key.endswith("_AST_FALLBACK")
+        }
+    return _ENV_SNAPSHOT
+
+
+@lru_cache(maxsize=None)
+def _verb_env_key(verb: str) -> str:
+    """Get the per-verb environment variable name for the verb
+
+    Not cleared by `_reset_verb_ast_fallback_cache()`, since the name of
+    the environment variable does not depend on the environment.
+    """
+    # Convert verb name to uppercase, removing trailing underscore if present
+    # e.g., "select" -> "DATAR_SELECT_AST_FALLBACK",
+    # "filter_" -> "DATAR_FILTER_AST_FALLBACK"
+    return f"DATAR_{verb.rstrip('_').upper()}_AST_FALLBACK"
 
 
 def get_verb_ast_fallback(verb: str) -> str | None:
@@ -9,6 +52,11 @@ def get_verb_ast_fallback(verb: str) -> str | None:
 
     Checks for per-verb environment variable first, then falls back to global.
 
+    The environment variables are read once, on the first lookup by any
+    module (datar itself or a backend plugin), and that snapshot is used
+    for all verbs registered afterwards. Changes made to the environment
+    after that are not picked up.
+
     Args:
         verb: The name of the verb (e.g., "mutate", "select", "filter")
 
@@ -20,21 +68,20 @@ def get_verb_ast_fallback(verb: str) -> str | None:
         >>> def mutate(...):
         ...     pass
     """
-    # Convert verb name to uppercase, removing trailing underscore if present
-    # e.g., "select" -> "SELECT", "filter_" -> "FILTER"
-    verb_name = verb.rstrip("_").upper()
+    snapshot = _env_snapshot()
 
     # Check for per-verb environment variable first
     # e.g., DATAR_MUTATE_AST_FALLBACK
-    per_verb_key = f"DATAR_{verb_name}_AST_FALLBACK"
-    per_verb_value = os.environ.get(per_verb_key)
+    per_verb_value = snapshot.get(_verb_env_key(verb))
     if per_verb_value:
         return per_verb_value
 
     # Fall back to global environment variable
-    global_key = "DATAR_VERB_AST_FALLBACK"
-    global_value = os.environ.get(global_key)
-    if global_value:
-        return global_value
+    return snapshot.get(_GLOBAL_AST_FALLBACK_KEY)
+
 
-    return None
+def _reset_verb_ast_fallback_cache() -> None:
+    """Invalidate the snapshot of the environment variables, so that they
+    are read again on the next lookup"""
+    global _ENV_SNAPSHOT
+    _ENV_SNAPSHOT = None
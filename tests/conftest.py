@@ -1,6 +1,17 @@
+import pytest
+
 from datar import options
+from datar.core.verb_env import _reset_verb_ast_fallback_cache
 
 
 def pytest_sessionstart(session):
     # Load no plugins
     options(backends=[None])
+
+
+@pytest.fixture
+def reset_verb_ast_fallback_cache():
+    """The env vars are snapshotted, reset the snapshot as tests change them"""
+    _reset_verb_ast_fallback_cache()
+    yield
+    _reset_verb_ast_fallback_cache()
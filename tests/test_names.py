@@ -43,6 +43,7 @@ def test_minimal(names, expect):
         (["a__3", "a", "a"], ["a__0", "a__1", "a__2"]),
         (["a__2", "a", "a"], ["a__0", "a__1", "a__2"]),
         (["a__2", "a__2", "a__2"], ["a__0", "a__1", "a__2"]),
+        (["a", "b", "a", "c", "b"], ["a__0", "b__1", "a__2", "c", "b__4"]),
         (
             ["__20", "a__1", "b", "", "a__2"],
             ["__0", "a__1", "b", "__3", "a__4"],
@@ -148,11 +149,17 @@ def test_check_unique():
         repair_names([""], repair="check_unique")
     with pytest.raises(NameNonUniqueError):
         repair_names(["a", "a"], repair="check_unique")
+    with pytest.raises(NameNonUniqueError):
+        repair_names(iter(["a", "a"]), repair="check_unique")
+    with pytest.raises(NameNonUniqueError):
+        repair_names(["a", "b", "c", "b"], repair="check_unique")
     with pytest.raises(NameNonUniqueError):
         repair_names(["__1"], repair="check_unique")
     with pytest.raises(NameNonUniqueError):
         repair_names(["__"], repair="check_unique")
     assert repair_names(["a", "b"], repair="check_unique") == ["a", "b"]
+    names = ("a", "b")
+    assert repair_names(names, repair="check_unique") is names
 
 
 def test_custom_repair():
@@ -1,133 +1,151 @@
 """Integration test to demonstrate the environment variable feature"""
-import os
 import pytest
+from pipda import Expression, VerbCall, register_verb
 
+from datar.core.verb_env import get_verb_ast_fallback
 
-def test_verb_ast_fallback_piping():
-    """Test that DATAR_*_AST_FALLBACK works with piping mode"""
-    from pipda import register_verb
-    from datar.core.verb_env import get_verb_ast_fallback
 
-    # Set environment variable for piping mode
-    os.environ['DATAR_PLUS_AST_FALLBACK'] = 'piping'
+pytestmark = pytest.mark.usefixtures("reset_verb_ast_fallback_cache")
 
-    try:
-        # Register a simple verb
-        @register_verb(ast_fallback=get_verb_ast_fallback("plus"))
-        def plus(x, y):
-            return x + y
 
-        # Test with exec to disable source code detection at runtime
-        # In piping mode, piping call should work
-        result = {}
-        exec("result['val'] = 1 >> plus(1)", {"plus": plus, "result": result})
-        assert result['val'] == 2
-
-        # Normal call in piping mode returns a placeholder when AST is not available
-        result = {}
-        exec("result['val'] = plus(1, 1)", {"plus": plus, "result": result})
-        # The result is a placeholder object, not the actual computation
-        assert str(result['val']) == 'plus(., 1, 1)'
-
-    finally:
-        del os.environ['DATAR_PLUS_AST_FALLBACK']
-
-
-def test_verb_ast_fallback_normal():
-    """Test that DATAR_*_AST_FALLBACK works with normal mode"""
-    from pipda import register_verb
-    from datar.core.verb_env import get_verb_ast_fallback
-
-    # Set environment variable for normal mode
-    os.environ['DATAR_MINUS_AST_FALLBACK'] = 'normal'
-
-    try:
-        # Register a simple verb
-        @register_verb(ast_fallback=get_verb_ast_fallback("minus"))
-        def minus(x, y):
-            return x - y
-
-        # Test with exec to disable source code detection at runtime
-        # In normal mode, normal call should work
-        result = {}
-        exec("result['val'] = minus(5, 3)", {"minus": minus, "result": result})
-        assert result['val'] == 2
-
-        # Piping call in normal mode raises TypeError when AST is not available
-        result = {}
-        with pytest.raises(TypeError):
-            exec("result['val'] = 5 >> minus(3)", {"minus": minus, "result": result})
-
-    finally:
-        del os.environ['DATAR_MINUS_AST_FALLBACK']
+# Code evaluated with eval() so that the AST node of the call is not
+# available at runtime, compiled once here
+_PLUS_PIPING = compile("1 >> plus(1)", "<string>", "eval")
+_PLUS_NORMAL = compile("plus(1, 1)", "<string>", "eval")
+_MINUS_NORMAL = compile("minus(5, 3)", "<string>", "eval")
+_MINUS_PIPING = compile("5 >> minus(3)", "<string>", "eval")
+_MULTIPLY_PIPING = compile("6 >> multiply(2)", "<string>", "eval")
+_DIVIDE_PIPING = compile("10 >> divide(2)", "<string>", "eval")
+_POWER_PIPING = compile("2 >> power(3)", "<string>", "eval")
+_MODULO_NORMAL = compile("modulo(10, 3)", "<string>", "eval")
 
 
-def test_verb_ast_fallback_global():
-    """Test that DATAR_VERB_AST_FALLBACK works as global fallback"""
-    from pipda import register_verb
-    from datar.core.verb_env import get_verb_ast_fallback
+def plus(x, y):
+    return x + y
 
-    # Set global environment variable
-    os.environ['DATAR_VERB_AST_FALLBACK'] = 'piping'
 
-    try:
-        # Register verbs without specific env var
-        @register_verb(ast_fallback=get_verb_ast_fallback("multiply"))
-        def multiply(x, y):
-            return x * y
+def minus(x, y):
+    return x - y
 
-        @register_verb(ast_fallback=get_verb_ast_fallback("divide"))
-        def divide(x, y):
-            return x / y
 
-        # Both should use global piping mode
-        result = {}
-        exec("result['mul'] = 6 >> multiply(2)", {"multiply": multiply, "result": result})
-        assert result['mul'] == 12
+def multiply(x, y):
+    return x * y
 
-        exec("result['div'] = 10 >> divide(2)", {"divide": divide, "result": result})
-        assert result['div'] == 5
 
-    finally:
-        del os.environ['DATAR_VERB_AST_FALLBACK']
+def divide(x, y):
+    return x / y
 
 
-def test_verb_ast_fallback_precedence():
-    """Test that per-verb env var takes precedence over global"""
-    from pipda import register_verb
-    from datar.core.verb_env import get_verb_ast_fallback
+def power(x, y):
+    return x ** y
 
-    # Set global to piping and specific verb to normal
-    os.environ['DATAR_VERB_AST_FALLBACK'] = 'piping'
-    os.environ['DATAR_MODULO_AST_FALLBACK'] = 'normal'
 
-    try:
-        # Register verbs
-        @register_verb(ast_fallback=get_verb_ast_fallback("power"))
-        def power(x, y):
-            return x ** y
+def modulo(x, y):
+    return x % y
 
-        @register_verb(ast_fallback=get_verb_ast_fallback("modulo"))
-        def modulo(x, y):
-            return x % y
 
-        # power should use global piping mode
-        result = {}
-        exec("result['pow'] = 2 >> power(3)", {"power": power, "result": result})
-        assert result['pow'] == 8
+def _register(monkeypatch, envs, func):
+    """Register func as a verb under the given env vars
 
-        # modulo should use specific normal mode
-        exec("result['mod'] = modulo(10, 3)", {"modulo": modulo, "result": result})
-        assert result['mod'] == 1
+    The ast_fallback is resolved at registration, so the env vars have to
+    be set before the verb is registered.
+    """
+    for key, val in envs.items():
+        monkeypatch.setenv(key, val)
+    return register_verb(ast_fallback=get_verb_ast_fallback(func.__name__))(
+        func
+    )
 
-    finally:
-        del os.environ['DATAR_VERB_AST_FALLBACK']
-        del os.environ['DATAR_MODULO_AST_FALLBACK']
 
-
-if __name__ == "__main__":
-    test_verb_ast_fallback_piping()
-    test_verb_ast_fallback_normal()
-    test_verb_ast_fallback_global()
-    test_verb_ast_fallback_precedence()
-    print("All integration tests passed!")
+@pytest.mark.parametrize(
+    "envs, func, code, expected",
+    [
+        # In piping mode, piping call should work
+        pytest.param(
+            {"DATAR_PLUS_AST_FALLBACK": "piping"},
+            plus,
+            _PLUS_PIPING,
+            2,
+            id="piping",
+        ),
+        # In normal mode, normal call should work
+        pytest.param(
+            {"DATAR_MINUS_AST_FALLBACK": "normal"},
+            minus,
+            _MINUS_NORMAL,
+            2,
+            id="normal",
+        ),
+        # Verbs without specific env var use the global piping mode
+        pytest.param(
+            {"DATAR_VERB_AST_FALLBACK": "piping"},
+            multiply,
+            _MULTIPLY_PIPING,
+            12,
+            id="global-multiply",
+        ),
+        pytest.param(
+            {"DATAR_VERB_AST_FALLBACK": "piping"},
+            divide,
+            _DIVIDE_PIPING,
+            5,
+            id="global-divide",
+        ),
+        # Per-verb env var takes precedence over global
+        pytest.param(
+            {
+                "DATAR_VERB_AST_FALLBACK": "piping",
+                "DATAR_MODULO_AST_FALLBACK": "normal",
+            },
+            power,
+            _POWER_PIPING,
+            8,
+            id="precedence-global",
+        ),
+        pytest.param(
+            {
+                "DATAR_VERB_AST_FALLBACK": "piping",
+                "DATAR_MODULO_AST_FALLBACK": "normal",
+            },
+            modulo,
+            _MODULO_NORMAL,
+            1,
+            id="precedence-per-verb",
+        ),
+    ],
+)
+def test_verb_ast_fallback(monkeypatch, envs, func, code, expected):
+    """Test that DATAR_*_AST_FALLBACK decides how verbs are called"""
+    verb = _register(monkeypatch, envs, func)
+
+    # Test with eval to disable source code detection at runtime
+    result = eval(code, {func.__name__: verb})
+    # A placeholder's == builds an expression, which is always truthy
+    assert not isinstance(result, Expression)
+    assert result == expected
+
+
+def test_verb_ast_fallback_normal_piping_call(monkeypatch):
+    """Test that a piping call in normal mode raises TypeError
+    when AST is not available"""
+    verb = _register(
+        monkeypatch, {"DATAR_MINUS_AST_FALLBACK": "normal"}, minus
+    )
+
+    with pytest.raises(TypeError):
+        eval(_MINUS_PIPING, {"minus": verb})
+
+
+def test_verb_ast_fallback_piping_placeholder(monkeypatch):
+    """Test that a normal call in piping mode returns a placeholder"""
+    verb = _register(monkeypatch, {"DATAR_PLUS_AST_FALLBACK": "piping"}, plus)
+
+    # Normal call in piping mode returns a placeholder
+    # when AST is not available
+    result = eval(_PLUS_NORMAL, {"plus": verb})
+    # The result is a placeholder object, not the actual computation
+    # i.e. plus(., 1, 1), waiting for the data to be piped in
+    assert isinstance(result, VerbCall)
+    assert result._pipda_func is verb
+    assert result._pipda_args == (1, 1)
+    assert result._pipda_kwargs == {}